@@ -1,5 +1,8 @@
+import os
+import sys
+import threading
+import hashlib
 import requests
-import base64
 import json
 import spacy
 from collections import Counter
@@ -9,6 +12,14 @@ from transformers import RobertaTokenizer, RobertaModel
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 
+# Share the snippet tooling that lives next to the offline indexer
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'optimal-method'))
+from connectors import SourceError, make_connector
+from extractors import MAX_SNIPPET_CHARS, extract_symbols, is_supported
+from jobs import JOB_HANDLERS, JobQueue, WorkerPool, pipeline, register_job
+from snippet_store import is_snippet_store, iter_snippets
+from suggest_index import SuggestIndex
+
 # Initialize the Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -20,6 +31,35 @@ nlp = spacy.load("en_core_web_sm")
 tokenizer = RobertaTokenizer.from_pretrained("microsoft/codebert-base")
 model = RobertaModel.from_pretrained("microsoft/codebert-base")
 
+# Snippet index used for autocomplete; prefer the compact store over the JSON file
+SNIPPETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'optimal-method')
+SNIPPETS_PATH = os.environ.get('SNIPPETS_PATH') or (
+    os.path.join(SNIPPETS_DIR, 'code_snippets.store')
+    if is_snippet_store(os.path.join(SNIPPETS_DIR, 'code_snippets.store'))
+    else os.path.join(SNIPPETS_DIR, 'code_snippets.json')
+)
+suggest_index = SuggestIndex(SNIPPETS_PATH, 'programming_keywords.json')
+
+# CodeBERT embeddings of indexed snippets, keyed by a hash of the snippet text and
+# filled by 'embed' jobs, so searches only embed code that has not been seen before
+EMBEDDINGS_PATH = os.path.join(SNIPPETS_DIR, 'code_snippets.embeddings.pt')
+embedding_cache = torch.load(EMBEDDINGS_PATH) if os.path.exists(EMBEDDINGS_PATH) else {}
+embedding_lock = threading.Lock()  # serializes embed jobs, which add to and save the cache
+
+# Background jobs (crawl, extract, embed, index, search) share one persistent queue.
+# Searches have workers of their own, so a long indexing run never delays them, and
+# indexing jobs get a single worker, so they cannot take every thread.
+job_queue = JobQueue(os.path.join(SNIPPETS_DIR, 'jobs.db'))
+search_pool = WorkerPool(job_queue, workers=2, poll_interval=0.2, job_types=['search'], name='search-worker')
+index_pool = WorkerPool(job_queue, workers=1, job_types=['crawl', 'extract', 'embed', 'index'], name='index-worker')
+
+# Repositories that jobs submitted over HTTP may crawl: an os.pathsep-separated list
+# of bare clones or working trees in the LOCAL_REPOS environment variable
+LOCAL_REPOS = [os.path.abspath(path) for path in os.environ.get('LOCAL_REPOS', '').split(os.pathsep) if path]
+
+# Job parameters callers may set; the files jobs write are always chosen here
+JOB_PARAMS = {'local_repos', 'revision', 'query'}
+
 # Load programming-related keywords from JSON file
 def load_keywords(file_path):
     with open(file_path, 'r') as json_file:
@@ -63,6 +103,18 @@ def get_embedding(text):
         embeddings = outputs.last_hidden_state[:, 0, :].squeeze()
     return embeddings
 
+def snippet_key(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def get_code_embedding(code):
+    """
+    Get the embedding of a code snippet, using the precomputed embeddings when available.
+    """
+    embedding = embedding_cache.get(snippet_key(code))
+    if embedding is None:
+        embedding = get_embedding(code)
+    return embedding
+
 def cosine_similarity(embedding1, embedding2):
     """
     Calculate the cosine similarity between two embeddings.
@@ -77,7 +129,7 @@ def find_most_relevant_code(query, code_snippets):
     query_embedding = get_embedding(query)
 
     # Get embeddings for all code snippets
-    code_embeddings = [get_embedding(code) for code in code_snippets]
+    code_embeddings = [get_code_embedding(code) for code in code_snippets]
 
     # Compute similarity scores
     similarities = [cosine_similarity(query_embedding, code_embedding) for code_embedding in code_embeddings]
@@ -86,15 +138,36 @@ def find_most_relevant_code(query, code_snippets):
     most_relevant_index = similarities.index(max(similarities))
     return code_snippets[most_relevant_index], similarities[most_relevant_index]
 
+def find_symbol_snippet(content, file_path, keyword):
+    """
+    Return the source of the symbol that best matches the keyword, or None.
+    Symbols named after the keyword win; otherwise the smallest symbol mentioning it.
+    """
+    keyword = keyword.lower()
+    symbols = extract_symbols(content, file_path)
+
+    named = [s for s in symbols if keyword in s.name.lower()]
+    if named:
+        best = min(named, key=lambda s: s.start)
+    else:
+        mentioning = [s for s in symbols if keyword in content[s.start:s.end].lower()]
+        if not mentioning:
+            return None
+        best = min(mentioning, key=lambda s: s.end - s.start)
+    return content[best.start:best.end][:MAX_SNIPPET_CHARS]
+
 # Fetch file content and search for the relevant keyword
-def fetch_and_search(repo_id, item_path, keyword, headers, organization, project):
-    content_url = f"https://dev.azure.com/{organization}/{project}/_apis/git/repositories/{repo_id}/items?path={item_path}&api-version=7.0&$format=text"
-    content_response = requests.get(content_url, headers=headers)
+def fetch_and_search(connector, repo, item_path, keyword):
+    content = connector.read_file(repo, item_path)
 
-    if content_response.status_code == 200:
-        content = content_response.text
+    if content is not None:
+        # Prefer a parsed, symbol-level snippet for supported languages
+        if is_supported(item_path):
+            symbol_snippet = find_symbol_snippet(content, item_path, keyword)
+            if symbol_snippet:
+                return (item_path, symbol_snippet)
 
-        # Extract the portion with the relevant keyword (class, function, etc.)
+        # Otherwise extract the portion with the relevant keyword (class, function, etc.)
         start_index = content.lower().find(keyword.lower())
         if start_index != -1:
             # Capture a portion of the code starting from the keyword
@@ -175,31 +248,23 @@ def evaluate_code(snippet, standards):
     return alignment_percentage, list(suggestions)  # Convert set back to list for output
 
 # Search for the relevant keyword in Azure DevOps
-def search_video_processor_class(query):
+def search_video_processor_class(query, connector=None, progress=None):
     # Azure DevOps configuration
     organization = ""  
     project =""
     pat = ""
+    # Paths to local bare clones or working trees; when set they are searched instead of Azure DevOps
+    local_repos = []
 
-    # Create authorization header with PAT
-    authorization = str(base64.b64encode(bytes(':' + pat, 'ascii')), 'ascii')
-    headers = {
-        'Authorization': 'Basic ' + authorization,
-        'Accept': 'application/json'
-    }
-
-    # Use the Git API endpoint to list repositories
-    repos_url = f"https://dev.azure.com/{organization}/{project}/_apis/git/repositories?api-version=7.0"
+    if connector is None:
+        connector = make_connector(local_repos, organization=organization, project=project, pat=pat)
 
     # List of excluded file extensions
     excluded_extensions = ['.mp4','.json','.avi', '.mkv', '.wav', '.mp3', '.jpg', '.jpeg', '.png', '.pkl', '.h5', '.pt', '.unet']
 
     try:
         # Get list of repositories
-        repos_response = requests.get(repos_url, headers=headers)
-        repos_response.raise_for_status()
-
-        repos = repos_response.json()['value']
+        repos = connector.list_repositories()
 
         # Load programming keywords from JSON file
         programming_keywords = load_keywords('programming_keywords.json')
@@ -213,36 +278,31 @@ def search_video_processor_class(query):
         # Search through each repository
         code_snippets = []
         for repo in repos:
-            repo_id = repo['id']
-
-            # Get all items in the repository
-            items_url = f"https://dev.azure.com/{organization}/{project}/_apis/git/repositories/{repo_id}/items?recursionLevel=Full&api-version=7.0"
-
-            items_response = requests.get(items_url, headers=headers)
-
-            if items_response.status_code == 200:
-                items_data = items_response.json()
-                if 'value' in items_data:
-                    # Search through all file types
-                    files = items_data['value']
-
-                    # Filter out excluded file types
-                    files = [item for item in files if not any(item['path'].endswith(ext) for ext in excluded_extensions)]
-
-                    # Create a ThreadPoolExecutor to handle multithreading
-                    with ThreadPoolExecutor(max_workers=10) as executor:
-                        future_to_file = {executor.submit(fetch_and_search, repo_id, item['path'], keyword, headers, organization, project): item['path'] for item in files}
-
-                        for future in as_completed(future_to_file):
-                            file_path, snippet = future.result()
-                            if snippet:
-                                code_snippets.append((file_path, snippet))  # Store the relevant snippet for later use
+            # Get all files in the repository
+            try:
+                files = connector.list_files(repo)
+            except SourceError:
+                continue
+
+            # Filter out excluded file types
+            files = [path for path in files if not any(path.endswith(ext) for ext in excluded_extensions)]
+
+            # Create a ThreadPoolExecutor to handle multithreading
+            with ThreadPoolExecutor(max_workers=10) as executor:
+                future_to_file = {executor.submit(fetch_and_search, connector, repo, path, keyword): path for path in files}
+
+                for done, future in enumerate(as_completed(future_to_file), 1):
+                    if progress and done % 50 == 0:
+                        progress(0.9 * done / len(future_to_file), f"Searched {done} of {len(future_to_file)} files in {repo['name']}")
+                    file_path, snippet = future.result()
+                    if snippet:
+                        code_snippets.append((repo, file_path, snippet))  # Store the relevant snippet for later use
 
         # Find the most relevant code snippet from the fetched snippets
         if code_snippets:
-            most_relevant_code, similarity_score = find_most_relevant_code(query, [s[1] for s in code_snippets])
-            # Get the file path of the most relevant code
-            file_link = next(item[0] for item in code_snippets if item[1] == most_relevant_code)
+            most_relevant_code, similarity_score = find_most_relevant_code(query, [s[2] for s in code_snippets])
+            # Get the repository and file path of the most relevant code
+            repo, file_path = next((item[0], item[1]) for item in code_snippets if item[2] == most_relevant_code)
             
             # Load code standards
             standards = load_code_standards()
@@ -253,15 +313,17 @@ def search_video_processor_class(query):
             return {
                 "most_relevant_code": most_relevant_code,
                 "similarity_score": similarity_score,
-                "file_link": f"https://dev.azure.com/{organization}/{project}/_git/{repo_id}?path={file_link}",
+                "file_link": connector.file_link(repo, file_path),
                 "alignment_percentage": alignment_percentage,
                 "suggestions": suggestions
             }
         else:
             return {"error": "No relevant code snippets found."}
 
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, SourceError) as e:
         return {"error": str(e)}
+    finally:
+        connector.close()
 
 # Define a route to handle incoming search queries
 @app.route('/search', methods=['POST'])
@@ -274,5 +336,118 @@ def search():
     result = search_video_processor_class(query)
     return jsonify(result)
 
+@register_job('search')
+def search_job(params, progress):
+    return search_video_processor_class(params['query'], progress=progress)
+
+@register_job('embed')
+def embed_job(params, progress):
+    """
+    Precompute CodeBERT embeddings for every indexed snippet that does not have one yet.
+    """
+    snippets = list(iter_snippets(params.get('snippets_path', SNIPPETS_PATH)))
+    added = 0
+    with embedding_lock:
+        for i, snippet in enumerate(snippets):
+            key = snippet_key(snippet['snippet'])
+            if key not in embedding_cache:
+                embedding_cache[key] = get_embedding(snippet['snippet'])
+                added += 1
+            if i % 20 == 0:
+                progress(i / len(snippets), f"Embedded {i} of {len(snippets)} snippets")
+
+        # Save a snapshot under a temporary name of our own so a crash never leaves a
+        # truncated cache behind and other processes' saves cannot collide with it
+        tmp_path = f"{EMBEDDINGS_PATH}.{os.getpid()}.tmp"
+        torch.save(dict(embedding_cache), tmp_path)
+        os.replace(tmp_path, EMBEDDINGS_PATH)
+    return {"snippets": len(snippets), "embedded": added}
+
+# Queue a background job, e.g. {"type": "extract", "params": {"local_repos": [...]}}.
+# "type": "pipeline" chains crawl -> extract -> embed -> index with shared params.
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    job_type = body.get('type')
+    params = body.get('params') or {}
+    run_after = body.get('run_after')  # Unix timestamp, e.g. to re-index off-peak
+
+    if not isinstance(params, dict):
+        return jsonify({"error": "params must be a JSON object"}), 400
+    unknown = sorted(set(params) - JOB_PARAMS)
+    if unknown:
+        return jsonify({"error": f"Unknown job parameters: {', '.join(unknown)}"}), 400
+    local_repos = params.get('local_repos', [])
+    if not isinstance(local_repos, list) or not all(
+            isinstance(path, str) and os.path.abspath(path) in LOCAL_REPOS for path in local_repos):
+        return jsonify({"error": "local_repos may only list repositories configured in LOCAL_REPOS"}), 400
+    revision = params.get('revision')
+    if revision is not None and (not isinstance(revision, str) or not revision or revision.startswith('-')):
+        return jsonify({"error": "revision must be a branch, tag or commit"}), 400
+    if run_after is not None and not isinstance(run_after, (int, float)):
+        return jsonify({"error": "run_after must be a Unix timestamp"}), 400
+
+    # Indexing jobs read and write the same snippet files this app serves from
+    params['output_file'] = os.path.join(SNIPPETS_DIR, 'code_snippets.json')
+    params['store_path'] = os.path.join(SNIPPETS_DIR, 'code_snippets.store')
+    params['revisions_file'] = os.path.join(SNIPPETS_DIR, 'code_snippets.revisions.json')
+    params['snippets_path'] = params['store_path']
+
+    if job_type == 'pipeline':
+        job_type, params = pipeline(*[(step, params) for step in ('crawl', 'extract', 'embed', 'index')])
+    elif job_type not in JOB_HANDLERS:
+        return jsonify({"error": f"Unknown job type: {job_type}"}), 400
+
+    job_id = job_queue.submit(job_type, params, run_after)
+    return jsonify({"job_id": job_id, "status_url": f"/jobs/{job_id}"}), 202
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    return jsonify({"jobs": job_queue.list(request.args.get('status'), limit)})
+
+# Job status, progress and, once done, the result
+@app.route('/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+# Submit a search to run in the background and poll /jobs/<id> for the result
+@app.route('/search/async', methods=['POST'])
+def search_async():
+    query = request.json.get('query')
+    if not query:
+        return jsonify({"error": "No query provided"}), 400
+
+    job_id = job_queue.submit('search', {"query": query})
+    return jsonify({"job_id": job_id, "status_url": f"/jobs/{job_id}"}), 202
+
+# Suggest symbol names and keywords for a partially typed query
+@app.route('/suggest', methods=['GET'])
+def suggest():
+    prefix = request.args.get('q', '').strip()
+    if not prefix:
+        return jsonify({"suggestions": []})
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+
+    # Only a stat here; a rebuilt snippet index is rescanned in a background thread
+    suggest_index.refresh_async()
+
+    # Complete the last word of the query so multi-word queries still get suggestions
+    suggestions = suggest_index.suggest(prefix.split()[-1], limit)
+    return jsonify({"suggestions": [{"term": term, "count": count} for term, count in suggestions]})
+
+# Start the workers once the handlers above are registered, whether the app is run
+# directly or imported by a WSGI server. With `python final.py` the debug reloader
+# serves requests from a child process (WERKZEUG_RUN_MAIN set); its parent only
+# watches for file changes and must not run jobs as well.
+if __name__ != "__main__" or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+    search_pool.start()
+    index_pool.start()
+
 if __name__ == "__main__":
     app.run(port=5000, debug=True)
\ No newline at end of file
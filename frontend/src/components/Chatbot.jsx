@@ -1,10 +1,14 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { Send, Code, Bot, Link as LinkIcon } from 'lucide-react';
 
+// Search jobs are polled once a second; give up after two minutes
+const MAX_SEARCH_POLLS = 120;
+
 const Chatbot = () => {
   const [messages, setMessages] = useState([]);
   const [input, setInput] = useState('');
   const [isLoading, setIsLoading] = useState(false);
+  const [suggestions, setSuggestions] = useState([]);
   const messagesEndRef = useRef(null);
 
   const scrollToBottom = () => {
@@ -13,6 +17,35 @@ const Chatbot = () => {
 
   useEffect(scrollToBottom, [messages]);
 
+  // Fetch autocomplete suggestions while typing, debounced to one request per pause
+  useEffect(() => {
+    const words = input.trim().split(/\s+/);
+    const prefix = words[words.length - 1];
+    if (!prefix) {
+      setSuggestions([]);
+      return;
+    }
+
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const response = await fetch(`http://localhost:5000/suggest?q=${encodeURIComponent(prefix)}`, {
+          signal: controller.signal,
+        });
+        const data = await response.json();
+        const head = words.slice(0, -1).join(' ');
+        setSuggestions((data.suggestions || []).map(s => (head ? `${head} ${s.term}` : s.term)));
+      } catch (error) {
+        if (error.name !== 'AbortError') setSuggestions([]);
+      }
+    }, 150);
+
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [input]);
+
   const sendMessage = async () => {
     if (input.trim() === '') return;
 
@@ -22,7 +55,8 @@ const Chatbot = () => {
     setIsLoading(true);
 
     try {
-      const response = await fetch('http://localhost:5000/search', {
+      // Submit the search as a background job and poll it, instead of holding the request open
+      const response = await fetch('http://localhost:5000/search/async', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -30,7 +64,20 @@ const Chatbot = () => {
         body: JSON.stringify({ query: input }),
       });
 
-      const data = await response.json();
+      const submitted = await response.json();
+      if (submitted.error) throw new Error(submitted.error);
+
+      let job;
+      let polls = 0;
+      do {
+        if (++polls > MAX_SEARCH_POLLS) throw new Error('Search timed out, please try again');
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const status = await fetch(`http://localhost:5000${submitted.status_url}`);
+        if (!status.ok) throw new Error(`Could not get the search status (HTTP ${status.status})`);
+        job = await status.json();
+      } while (job.status === 'queued' || job.status === 'running');
+
+      const data = job.status === 'done' ? job.result : { error: job.error || `Search ${job.status}` };
 
       if (data.error) {
         setMessages(msgs => [...msgs, { text: `Error: ${data.error}`, sender: 'bot' }]);
@@ -98,9 +145,15 @@ const Chatbot = () => {
             onChange={(e) => setInput(e.target.value)}
             onKeyPress={(e) => e.key === 'Enter' && sendMessage()}
             placeholder="Ask about your code..."
+            list="query-suggestions"
             className="flex-grow p-3 border border-gray-300 rounded-full focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent"
             disabled={isLoading}
           />
+          <datalist id="query-suggestions">
+            {suggestions.map((suggestion) => (
+              <option key={suggestion} value={suggestion} />
+            ))}
+          </datalist>
           <button
             onClick={sendMessage}
             disabled={isLoading}
@@ -0,0 +1,197 @@
+import os
+import sys
+import time
+from collections import defaultdict
+
+from extractors import EXTRACTORS, get_extractor
+
+# Small representative files used when no source directory is given
+SAMPLES = {
+    '.py': '''
+class VideoProcessor:
+    """Process uploaded videos."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self, filename=None):
+        # Reset state between uploads
+        self.video_filename = filename
+        self.cancel_processing = False
+
+async def process_video_thread(path):
+    return path.lower()
+''',
+    '.js': '''
+import React from 'react';
+
+export class FrameBuffer {
+  constructor(size) {
+    this.size = size; // "{" in a comment
+  }
+
+  push(frame) {
+    if (this.frames.length > this.size) { this.frames.shift(); }
+    this.frames.push(frame);
+  }
+}
+
+export function formatScore(score) {
+  return `${score.toFixed(2)} }`;
+}
+
+const sendMessage = async (input) => {
+  await fetch('/search', { method: 'POST', body: JSON.stringify({ query: input }) });
+};
+''',
+    '.ts': '''
+export interface Detection {
+  label: string;
+  score: number;
+}
+
+export enum Status { Idle, Running }
+
+export class Tracker<T> {
+  private items: T[] = [];
+
+  public add(item: T): number {
+    this.items.push(item);
+    return this.items.length;
+  }
+}
+
+export const toLabel = (d: Detection): string => {
+  return d.label;
+};
+''',
+    '.cs': '''
+using System;
+
+namespace Detection
+{
+    public interface IMetrics
+    {
+        int TotalCount { get; }
+    }
+
+    public class DetectionMetrics : IMetrics
+    {
+        public int TotalCount { get; private set; }
+
+        public DetectionMetrics() : base()
+        {
+            TotalCount = 0;
+        }
+
+        public async Task<List<string>> LoadAsync(string path)
+        {
+            var text = @"literal with { brace";
+            return new List<string> { text };
+        }
+    }
+}
+''',
+    '.java': '''
+package detection;
+
+public class VideoProcessor implements Runnable {
+    private final String name;
+
+    public VideoProcessor(String name) {
+        this.name = name;
+    }
+
+    @Override
+    public void run() {
+        for (int i = 0; i < 10; i++) {
+            process(i);
+        }
+    }
+
+    private static int process(int frame) throws IllegalStateException {
+        return frame * 2; // '}' in a comment
+    }
+}
+''',
+}
+
+
+def load_sources(directory):
+    """
+    Collect supported source files under a directory, grouped by extractor language.
+    """
+    sources = defaultdict(list)
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            extractor = get_extractor(path)
+            if extractor is None:
+                continue
+            with open(path, 'r', encoding='utf-8', errors='replace') as file:
+                sources[extractor.language].append((path, file.read()))
+    return sources
+
+
+def sample_sources(copies=200):
+    """
+    Build a synthetic corpus from the built-in samples.
+    """
+    sources = defaultdict(list)
+    for extension, code in SAMPLES.items():
+        extractor = EXTRACTORS.get(extension)
+        if extractor is None:
+            continue
+        for i in range(copies):
+            sources[extractor.language].append((f'sample_{i}{extension}', code))
+    return sources
+
+
+def benchmark(sources, rounds=3):
+    """
+    Time extraction per language and return the backend used, files/s, MB/s, symbols,
+    files that failed to parse and files that parsed but contain no symbols.
+    """
+    results = {}
+    for language, files in sorted(sources.items()):
+        total_bytes = sum(len(code.encode('utf-8')) for _, code in files)
+        best = None
+        for _ in range(rounds):
+            symbols = 0
+            failed = 0
+            no_symbols = 0
+            start = time.perf_counter()
+            for path, code in files:
+                # Call the extractor directly: extract_symbols would hide failures as empty results
+                try:
+                    found = get_extractor(path).extract(code)
+                except Exception:
+                    failed += 1
+                    continue
+                symbols += len(found)
+                if not found:
+                    no_symbols += 1
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        best = max(best, 1e-9)
+        results[language] = {
+            'backend': get_extractor(files[0][0]).backend,
+            'files': len(files),
+            'symbols': symbols,
+            'failed': failed,
+            'no_symbols': no_symbols,
+            'files_per_second': len(files) / best,
+            'mb_per_second': total_bytes / best / 1e6,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    # Usage: python benchmark_extractors.py [source_directory]
+    sources = load_sources(sys.argv[1]) if len(sys.argv) > 1 else sample_sources()
+
+    print(f"{'language':<12}{'backend':<13}{'files':>8}{'symbols':>10}{'failed':>8}{'empty':>8}{'files/s':>12}{'MB/s':>10}")
+    for language, result in benchmark(sources).items():
+        print(f"{language:<12}{result['backend']:<13}{result['files']:>8}{result['symbols']:>10}{result['failed']:>8}"
+              f"{result['no_symbols']:>8}{result['files_per_second']:>12.0f}{result['mb_per_second']:>10.2f}")
@@ -0,0 +1,240 @@
+import base64
+import mmap
+import os
+import subprocess
+import threading
+
+import requests
+
+
+class SourceError(Exception):
+    """
+    Raised when a source connector cannot list or read a repository.
+    """
+
+
+class SourceConnector:
+    """
+    Base class for the places code is crawled from.
+
+    Repositories are plain dicts with at least 'id' and 'name'; file paths are
+    repository-relative and start with '/', as in the Azure DevOps API.
+    """
+
+    def list_repositories(self):
+        raise NotImplementedError
+
+    def list_files(self, repo):
+        raise NotImplementedError
+
+    def read_file(self, repo, path):
+        """
+        Return the file's text, or None if it cannot be read.
+        """
+        raise NotImplementedError
+
+    def current_revision(self, repo):
+        """
+        Return an identifier of the repository state that is being read, or None
+        if the source cannot tell (every crawl is then a full crawl).
+        """
+        return None
+
+    def changed_files(self, repo, since_revision):
+        """
+        Return (changed_paths, deleted_paths) between since_revision and the current revision.
+        Sources without history report every file as changed.
+        """
+        return self.list_files(repo), []
+
+    def file_link(self, repo, path):
+        return path
+
+    def close(self):
+        pass
+
+
+class AzureDevOpsConnector(SourceConnector):
+    """
+    Crawl repositories file by file over the Azure DevOps REST API.
+    """
+
+    def __init__(self, organization, project, pat):
+        self.organization = organization
+        self.project = project
+        self.base_url = f"https://dev.azure.com/{organization}/{project}/_apis/git/repositories"
+
+        # Create authorization header with PAT
+        authorization = str(base64.b64encode(bytes(':' + pat, 'ascii')), 'ascii')
+        # A session reuses the HTTPS connection across the per-file requests
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Authorization': 'Basic ' + authorization,
+            'Accept': 'application/json'
+        })
+
+    def list_repositories(self):
+        response = self.session.get(f"{self.base_url}?api-version=7.0")
+        response.raise_for_status()
+        return response.json()['value']
+
+    def list_files(self, repo):
+        items_url = f"{self.base_url}/{repo['id']}/items?recursionLevel=Full&api-version=7.0"
+        response = self.session.get(items_url)
+        if response.status_code != 200:
+            raise SourceError(f"Failed to fetch items. Status code: {response.status_code}. Response: {response.text}")
+        return [item['path'] for item in response.json().get('value', []) if not item.get('isFolder')]
+
+    def read_file(self, repo, path):
+        content_url = f"{self.base_url}/{repo['id']}/items?path={path}&api-version=7.0&$format=text"
+        response = self.session.get(content_url)
+        if response.status_code != 200:
+            return None
+        return response.text
+
+    def file_link(self, repo, path):
+        return f"https://dev.azure.com/{self.organization}/{self.project}/_git/{repo['id']}?path={path}"
+
+    def close(self):
+        self.session.close()
+
+
+class _CatFile:
+    """
+    A long-running `git cat-file --batch` process. Git serves the blobs straight out
+    of its memory-mapped packfiles, so reading a file costs a pipe round trip
+    instead of a process start or an HTTPS request.
+    """
+
+    def __init__(self, git_dir):
+        self._process = subprocess.Popen(
+            ['git', '--git-dir', git_dir, 'cat-file', '--batch'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        self._lock = threading.Lock()  # requests and responses must stay paired
+
+    def read(self, object_name):
+        with self._lock:
+            self._process.stdin.write(object_name.encode('utf-8') + b'\n')
+            self._process.stdin.flush()
+            # Found objects answer "<oid> <type> <size>"; anything else is "<name> missing"
+            # or "<name> ambiguous", where the name itself may contain spaces
+            header = self._process.stdout.readline().rstrip(b'\n').split(b' ')
+            if len(header) != 3 or not header[2].isdigit():
+                return None
+            data = self._process.stdout.read(int(header[2]))
+            self._process.stdout.read(1)  # trailing newline
+            return data
+
+    def close(self):
+        self._process.stdin.close()
+        self._process.wait()
+
+
+class LocalGitConnector(SourceConnector):
+    """
+    Crawl local git repositories: bare clones/mirrors or working trees.
+
+    With a revision (default HEAD) files are read from the object database and
+    later crawls only re-read the files changed since; with revision=None the
+    working tree is read from disk through memory-mapped files, in full every time.
+    """
+
+    def __init__(self, paths, revision='HEAD'):
+        self.paths = [paths] if isinstance(paths, str) else list(paths)
+        self.revision = revision
+        self._readers = {}
+        self._readers_lock = threading.Lock()
+
+    def _git(self, repo, *args):
+        try:
+            result = subprocess.run(['git', '--git-dir', repo['git_dir'], *args], capture_output=True, check=True)
+        except subprocess.CalledProcessError as e:
+            raise SourceError(f"git {' '.join(args)} failed in {repo['name']}: {e.stderr.decode(errors='replace').strip()}")
+        return result.stdout
+
+    def _reader(self, repo):
+        with self._readers_lock:
+            reader = self._readers.get(repo['id'])
+            if reader is None:
+                reader = self._readers[repo['id']] = _CatFile(repo['git_dir'])
+            return reader
+
+    def list_repositories(self):
+        repos = []
+        for path in self.paths:
+            path = os.path.abspath(path)
+            try:
+                git_dir = subprocess.run(
+                    ['git', '-C', path, 'rev-parse', '--absolute-git-dir'], capture_output=True, check=True, text=True
+                ).stdout.strip()
+            except subprocess.CalledProcessError:
+                raise SourceError(f"{path} is not a git repository")
+            is_bare = os.path.normpath(git_dir) == os.path.normpath(path)
+            if self.revision is None and is_bare:
+                raise SourceError(f"{path} is a bare repository and has no working tree to read")
+            repos.append({
+                'id': path,
+                'name': os.path.basename(path.rstrip(os.sep)),
+                'git_dir': git_dir,
+                'work_tree': None if is_bare else path
+            })
+        return repos
+
+    def list_files(self, repo):
+        if self.revision is None:
+            # Tracked files plus untracked ones that are not ignored
+            output = self._git(repo, '--work-tree', repo['work_tree'], 'ls-files', '-z', '--cached', '--others', '--exclude-standard')
+        else:
+            output = self._git(repo, 'ls-tree', '-r', '-z', '--name-only', self.revision)
+        return ['/' + name for name in output.decode('utf-8', errors='replace').split('\0') if name]
+
+    def read_file(self, repo, path):
+        if self.revision is None:
+            try:
+                with open(os.path.join(repo['work_tree'], path.lstrip('/')), 'rb') as file:
+                    if os.fstat(file.fileno()).st_size == 0:
+                        return ''  # mmap refuses empty files
+                    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        return data[:].decode('utf-8', errors='replace')
+            except OSError:
+                return None
+
+        data = self._reader(repo).read(f"{self.revision}:{path.lstrip('/')}")
+        return None if data is None else data.decode('utf-8', errors='replace')
+
+    def current_revision(self, repo):
+        if self.revision is None:
+            # No commit describes a working tree with local edits and untracked files,
+            # and a diff against HEAD misses edits that were reverted since the last run
+            return None
+        return self._git(repo, 'rev-parse', self.revision).decode().strip()
+
+    def changed_files(self, repo, since_revision):
+        if not since_revision or self.revision is None:
+            return self.list_files(repo), []
+
+        output = self._git(repo, 'diff', '--name-status', '-z', '--no-renames', since_revision, self.revision)
+        fields = output.decode('utf-8', errors='replace').split('\0')
+        changed, deleted = [], []
+        for status, name in zip(fields[0::2], fields[1::2]):
+            (deleted if status.startswith('D') else changed).append('/' + name)
+        return changed, deleted
+
+    def file_link(self, repo, path):
+        return os.path.join(repo['work_tree'] or repo['id'], path.lstrip('/'))
+
+    def close(self):
+        with self._readers_lock:
+            for reader in self._readers.values():
+                reader.close()
+            self._readers = {}
+
+
+def make_connector(local_repos=None, revision='HEAD', organization="", project="", pat=""):
+    """
+    Use local repositories when any are configured, otherwise Azure DevOps.
+    """
+    if local_repos:
+        return LocalGitConnector(local_repos, revision)
+    return AzureDevOpsConnector(organization, project, pat)
@@ -1,5 +1,5 @@
-import json
 from elasticsearch import Elasticsearch
+from snippet_store import iter_snippets
 
 def create_index(es, index_name):
     # Create an index if it doesn't exist
@@ -19,12 +19,11 @@ def create_index(es, index_name):
         print(f"Index '{index_name}' already exists.")
 
 def load_data(es, index_name, json_file):
-    with open(json_file, 'r') as file:
-        data = json.load(file)
-        
-        for item in data:
-            es.index(index=index_name, document=item)
-            print(f"Document indexed: {item}")
+    # Accepts either a snippet store directory or a legacy JSON file;
+    # snippets are streamed one at a time instead of parsed up front
+    for item in iter_snippets(json_file):
+        es.index(index=index_name, document=item)
+        print(f"Document indexed: {item}")
 
 if __name__ == "__main__":
     # Connect to Elasticsearch
@@ -1,132 +1,164 @@
+import os
 import requests
-import base64
 import json
-import ast
+import threading
+from connectors import SourceError, make_connector
+from extractors import extract_snippets, generate_tags, is_supported  # generate_tags stays importable from here
+from snippet_store import is_snippet_store, iter_snippets, write_store
 
 def extract_snippets_from_code(code, file_path):
     """
-    Extract functions and classes from the provided code and format them with description, tags, and file path.
+    Extract functions, methods, classes and types from the provided code and format them
+    with description, tags, and file path. Files that fail to parse yield no snippets.
     """
-    snippets = []
-
-    # Parse the code into an AST
-    tree = ast.parse(code)
-
-    # Iterate through the AST nodes
-    for node in ast.walk(tree):
-        # Extract function definitions
-        if isinstance(node, ast.FunctionDef):
-            snippet = ast.get_source_segment(code, node)
-            snippets.append({
-                'snippet': snippet,
-                'description': f'A function that defines {node.name}',
-                'tags': generate_tags(node.name),
-                'file_path': file_path
-            })
-        
-        # Extract class definitions
-        elif isinstance(node, ast.ClassDef):
-            snippet = ast.get_source_segment(code, node)
-            snippets.append({
-                'snippet': snippet,
-                'description': f'A class that defines {node.name}',
-                'tags': generate_tags(node.name),
-                'file_path': file_path
-            })
-    
-    return snippets
-
-def generate_tags(name):
+    return extract_snippets(code, file_path)
+
+def save_snippets_to_json(snippets, output_file):
+    """
+    Save snippets to a JSON file. The file is replaced in one step, so readers such
+    as the suggestion index never see it half written.
+    """
+    tmp_file = f"{output_file}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_file, 'w') as file:
+            json.dump(snippets, file, indent=4)
+        os.replace(tmp_file, output_file)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+def save_snippets_to_store(snippets, store_path):
     """
-    Generate tags based on function or class name.
+    Save snippets to a compact snippet store for fast, memory-mapped access.
     """
-    # Simple example: split function/class names into meaningful tags
-    return [name.lower()]
+    return write_store(snippets, store_path)
 
-def save_snippets_to_json(snippets, output_file):
+def load_revisions(revisions_file):
     """
-    Save snippets to a JSON file.
+    Load the repository revisions the current snippet index was built from.
     """
-    with open(output_file, 'w') as file:
-        json.dump(snippets, file, indent=4)
+    if not os.path.exists(revisions_file):
+        return {}
+    with open(revisions_file, 'r') as file:
+        return json.load(file)
 
-def search_and_extract_snippets():
+def search_and_extract_snippets(connector=None, output_file="code_snippets.json", store_path="code_snippets.store",
+                                revisions_file="code_snippets.revisions.json", progress=None):
+    """
+    Crawl all repositories of the connector and write the extracted snippets.
+    progress(fraction, message), if given, is called as files are processed.
+    Returns the number of snippets written, or None if the crawl failed.
+    """
     organization = ""
     project = ""
     pat = ""
+    # Paths to local bare clones or working trees; when set they are crawled instead of Azure DevOps
+    local_repos = []
 
-    # Create authorization header with PAT
-    authorization = str(base64.b64encode(bytes(':' + pat, 'ascii')), 'ascii')
-    headers = {
-        'Authorization': 'Basic ' + authorization,
-        'Accept': 'application/json'
-    }
-
-    # Use the Git API endpoint to list repositories
-    repos_url = f"https://dev.azure.com/{organization}/{project}/_apis/git/repositories?api-version=7.0"
+    if connector is None:
+        connector = make_connector(local_repos, organization=organization, project=project, pat=pat)
 
     try:
         # Get list of repositories
         print("Fetching repositories...")
-        repos_response = requests.get(repos_url, headers=headers)
-        repos_response.raise_for_status()
-
-        repos = repos_response.json()['value']
+        repos = connector.list_repositories()
         print(f"Found {len(repos)} repositories")
 
+        # Only re-extract files changed since the last run when every repository can
+        # tell which revision it was indexed at; otherwise do a full crawl
+        previous_revisions = load_revisions(revisions_file)
+        revisions = {}
+        unreadable = set()  # e.g. repositories without any commits yet; skipped below
+        for repo in repos:
+            try:
+                revisions[repo['id']] = connector.current_revision(repo)
+            except SourceError as e:
+                print(str(e))
+                revisions[repo['id']] = None  # forces a full crawl next time
+                unreadable.add(repo['id'])
+        incremental = (
+            is_snippet_store(store_path)
+            and set(previous_revisions) == set(revisions)
+            and all(revisions.values())
+        )
+
         all_snippets = []  # List to collect all snippets
+        stale_paths = set()  # Files whose previous snippets must be replaced
 
         # Search through each repository
-        for repo in repos:
-            repo_id = repo['id']
-            repo_name = repo['name']
-            print(f"\nSearching in repository: {repo_name}")
-            print(f"Repository ID: {repo_id}")
-
-            # Get items in the repository, filter by files only
-            items_url = f"https://dev.azure.com/{organization}/{project}/_apis/git/repositories/{repo_id}/items?recursionLevel=Full&api-version=7.0"
-
-            print(f"Fetching items from repository...")
-            items_response = requests.get(items_url, headers=headers)
-
-            if items_response.status_code == 200:
-                items_data = items_response.json()
-                if 'value' in items_data:
-                    # Filter Python files from the items
-                    python_files = [item for item in items_data['value'] if item.get('path', '').endswith('.py')]
-                    print(f"Found {len(python_files)} Python files")
-
-                    for item in python_files:
-                        print(f"\nChecking file: {item['path']}")
-                        # Get the file's actual content using 'download' API
-                        content_url = f"https://dev.azure.com/{organization}/{project}/_apis/git/repositories/{repo_id}/items?path={item['path']}&api-version=7.0&$format=text"
-                        content_response = requests.get(content_url, headers=headers)
-
-                        if content_response.status_code == 200:
-                            content = content_response.text
-                            # Extract snippets from the code with file path
-                            snippets = extract_snippets_from_code(content, item['path'])
-                            all_snippets.extend(snippets)  # Add to the main list
-
-                        else:
-                            print(f"Failed to fetch content for {item['path']}")
-                            print(f"Status code: {content_response.status_code}")
-                            print(f"Response: {content_response.text}")
+        for repo_index, repo in enumerate(repos):
+            print(f"\nSearching in repository: {repo['name']}")
+            print(f"Repository ID: {repo['id']}")
+            if repo['id'] in unreadable:
+                print("Skipping repository, its revision could not be read")
+                continue
+
+            try:
+                if incremental:
+                    files, deleted = connector.changed_files(repo, previous_revisions[repo['id']])
+                    stale_paths.update(files)
+                    stale_paths.update(deleted)
+                    print(f"{len(files)} files changed and {len(deleted)} deleted since {previous_revisions[repo['id']]}")
+                else:
+                    print(f"Fetching items from repository...")
+                    files = connector.list_files(repo)
+            except SourceError as e:
+                print(str(e))
+                revisions.pop(repo['id'], None)  # forces a full crawl next time
+                continue
+
+            # Filter source files in any language an extractor is registered for
+            source_files = [path for path in files if is_supported(path)]
+            print(f"Found {len(source_files)} source files")
+
+            for file_index, path in enumerate(source_files):
+                print(f"\nChecking file: {path}")
+                if progress:
+                    progress((repo_index + file_index / len(source_files)) / len(repos), f"{repo['name']}: {path}")
+                content = connector.read_file(repo, path)
+
+                if content is not None:
+                    # Extract snippets from the code with file path
+                    snippets = extract_snippets_from_code(content, path)
+                    all_snippets.extend(snippets)  # Add to the main list
                 else:
-                    print("No 'value' field in items response")
-            else:
-                print(f"Failed to fetch items. Status code: {items_response.status_code}")
-                print(f"Response: {items_response.text}")
+                    print(f"Failed to fetch content for {path}")
+                    # Its old snippets may already be dropped; don't record this revision as
+                    # indexed, so the next run re-extracts the file instead of skipping it
+                    revisions.pop(repo['id'], None)
+
+        if incremental:
+            # Keep the untouched snippets from the previous run. Snippets only record the
+            # file path, so a path changed in one repository refreshes it for all of them.
+            kept = [snippet for snippet in iter_snippets(store_path) if snippet['file_path'] not in stale_paths]
+            print(f"\nKept {len(kept)} unchanged snippets from the previous run.")
+            all_snippets = kept + all_snippets
 
         # Save all snippets to JSON file
-        output_file = "code_snippets.json"
         save_snippets_to_json(all_snippets, output_file)
         print(f"\nExtracted {len(all_snippets)} snippets and saved to {output_file}.")
 
+        save_snippets_to_store(all_snippets, store_path)
+        print(f"Snippet store written to {store_path}.")
+
+        if all(revisions.values()):
+            with open(revisions_file, 'w') as file:
+                json.dump(revisions, file, indent=4)
+        elif os.path.exists(revisions_file):
+            # The revisions of an earlier run no longer describe the store just written
+            os.remove(revisions_file)
+
+        return len(all_snippets)
+
     except requests.exceptions.RequestException as e:
         print(f"Error occurred: {str(e)}")
         if hasattr(e, 'response') and e.response is not None:
             print(f"Response content: {e.response.text}")
+    except SourceError as e:
+        print(f"Error occurred: {str(e)}")
+    finally:
+        connector.close()
 
 if __name__ == "__main__":
     search_and_extract_snippets()
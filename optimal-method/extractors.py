@@ -0,0 +1,367 @@
+import ast
+import os
+import re
+import warnings
+
+# tree-sitter grammars (see requirements.txt) parse JavaScript/TypeScript and C#/Java.
+# If they are missing the lexer-based extractor below is used instead, with a warning
+# the first time one of those languages is extracted
+try:
+    from tree_sitter_languages import get_parser
+except ImportError:
+    get_parser = None
+
+# Snippets longer than this are cut off so a single huge class cannot blow up
+# the index or the embedding step
+MAX_SNIPPET_CHARS = 20000
+
+# Registered extractors, keyed by lower-case file extension
+EXTRACTORS = {}
+
+
+def register_extractor(extractor):
+    """
+    Register an extractor instance for all of its file extensions.
+    """
+    for extension in extractor.extensions:
+        EXTRACTORS[extension] = extractor
+    return extractor
+
+
+def get_extractor(file_path):
+    """
+    Return the extractor for the given file, or None if the language is not supported.
+    """
+    return EXTRACTORS.get(os.path.splitext(file_path)[1].lower())
+
+
+def is_supported(file_path):
+    return get_extractor(file_path) is not None
+
+
+def generate_tags(name):
+    """
+    Generate tags based on function or class name.
+    """
+    # Simple example: split function/class names into meaningful tags
+    return [name.lower()]
+
+
+def describe_symbol(kind, name):
+    article = 'An' if kind[0] in 'aeiou' else 'A'
+    return f'{article} {kind} that defines {name}'
+
+
+class Symbol:
+    """
+    A single function, method, class or type found in a source file.
+    """
+
+    def __init__(self, kind, name, start, end):
+        self.kind = kind
+        self.name = name
+        self.start = start  # character offsets into the source
+        self.end = end
+
+    def __repr__(self):
+        return f'Symbol({self.kind!r}, {self.name!r}, {self.start}, {self.end})'
+
+
+_PYTHON_LINE_END = re.compile(r'(?<=\n)|(?<=\r)(?!\n)')
+
+
+class PythonExtractor:
+    """
+    Extract functions and classes from Python source using the ast module.
+    """
+    language = 'python'
+    extensions = ('.py',)
+    backend = 'ast'
+
+    def extract(self, code):
+        tree = ast.parse(code)
+
+        # ast reports lines and UTF-8 byte columns; map them to character offsets.
+        # Only \n, \r\n and \r end a line for ast (str.splitlines also breaks on \f, \x1c, ...)
+        lines = _PYTHON_LINE_END.split(code)
+        line_offsets = [0]
+        for line in lines:
+            line_offsets.append(line_offsets[-1] + len(line))
+
+        def offset(lineno, col_offset):
+            line = lines[lineno - 1]
+            return line_offsets[lineno - 1] + len(line.encode('utf-8')[:col_offset].decode('utf-8'))
+
+        symbols = []
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                kind = 'function'
+            elif isinstance(node, ast.ClassDef):
+                kind = 'class'
+            else:
+                continue
+            symbols.append(Symbol(kind, node.name, offset(node.lineno, node.col_offset), offset(node.end_lineno, node.end_col_offset)))
+        return symbols
+
+
+# Comments and string literals in C-like languages; blanked out before scanning
+# so braces and keywords inside them are ignored
+_C_NOISE = re.compile(
+    r'//[^\n]*'
+    r'|/\*.*?\*/'
+    r'|@"(?:""|[^"])*"'
+    r'|"(?:\\.|[^"\\\n])*"'
+    r"|'(?:\\.|[^'\\\n])*'"
+    r'|`(?:\\.|[^`\\])*`'
+    # JavaScript regex literals, recognised by the token before them, e.g. s.replace(/}/g, '')
+    r'|(?<=[(,=:\[!&|?{};])[ \t]*/(?![/*])(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/[a-z]*',
+    re.DOTALL
+)
+
+_CONTROL_KEYWORDS = {
+    'if', 'for', 'foreach', 'while', 'switch', 'catch', 'using', 'lock', 'return',
+    'function', 'else', 'do', 'try', 'finally', 'new', 'typeof', 'sizeof', 'synchronized'
+}
+
+
+def _blank(match):
+    # Keep newlines so offsets and line numbers are unchanged
+    return re.sub(r'[^\n]', ' ', match.group(0))
+
+
+def _find_block_end(blanked, position):
+    """
+    Return the offset just past the '}' that closes the first '{' at or after position,
+    or None if the declaration has no body (abstract/interface members, prototypes).
+    """
+    brace = len(blanked)
+    for terminator in ('{', ';'):
+        index = blanked.find(terminator, position)
+        if index != -1 and index < brace:
+            brace = index
+    if brace == len(blanked) or blanked[brace] != '{':
+        return None
+
+    depth = 0
+    for index in range(brace, len(blanked)):
+        char = blanked[index]
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return index + 1
+    return None
+
+
+class LexerExtractor:
+    """
+    Extract symbols from brace-delimited languages with declaration patterns and
+    brace matching over a copy of the source with comments and strings blanked out.
+    Only a fallback for when tree-sitter is unavailable: it is a heuristic, not a parser.
+    """
+    backend = 'lexer'
+
+    def __init__(self, language, extensions, patterns):
+        self.language = language
+        self.extensions = extensions
+        self.patterns = [(kind, re.compile(pattern, re.MULTILINE)) for kind, pattern in patterns]
+
+    def extract(self, code):
+        blanked = _C_NOISE.sub(_blank, code)
+
+        symbols = []
+        seen = set()
+        for pattern_kind, pattern in self.patterns:
+            for match in pattern.finditer(blanked):
+                name = match.group('name')
+                kind = match.groupdict().get('kind') or pattern_kind
+                if name in _CONTROL_KEYWORDS:
+                    continue
+                start = match.start('decl')
+                if start in seen:
+                    continue
+                # Method patterns consume the opening brace themselves
+                body_start = match.end() - 1 if blanked[match.end() - 1] == '{' else match.end()
+                end = _find_block_end(blanked, body_start)
+                if end is None:
+                    continue
+                seen.add(start)
+                symbols.append(Symbol(kind, name, start, end))
+
+        symbols.sort(key=lambda symbol: symbol.start)
+        return symbols
+
+
+class TreeSitterExtractor:
+    """
+    Extract symbols using a tree-sitter grammar, falling back to a lexer extractor
+    if the grammar cannot be loaded.
+    """
+
+    def __init__(self, language, extensions, grammar, node_kinds, fallback):
+        self.language = language
+        self.extensions = extensions
+        self.grammar = grammar
+        self.node_kinds = node_kinds  # tree-sitter node type -> symbol kind
+        self.fallback = fallback
+        self._parser = None
+        self._use_fallback = False
+
+    @property
+    def backend(self):
+        return self.fallback.backend if self._use_fallback else 'tree-sitter'
+
+    def extract(self, code):
+        if self._use_fallback:
+            return self.fallback.extract(code)
+        if self._parser is None:
+            if get_parser is None:
+                # One message for all languages; warnings shows it once per process
+                warnings.warn("tree_sitter_languages is not installed; JavaScript, TypeScript, C# and Java "
+                              "use the fallback lexer extractor, which can misplace symbol bodies. "
+                              "Install requirements.txt.", RuntimeWarning)
+                self._use_fallback = True
+                return self.fallback.extract(code)
+            try:
+                self._parser = get_parser(self.grammar)
+            except Exception as e:
+                # e.g. a tree-sitter version the prebuilt grammars do not support
+                warnings.warn(f"could not load the tree-sitter {self.grammar} grammar ({e}); "
+                              f"using the fallback lexer extractor for {self.language}", RuntimeWarning)
+                self._use_fallback = True
+                return self.fallback.extract(code)
+        source = code.encode('utf-8')
+        tree = self._parser.parse(source)
+
+        # tree-sitter works in bytes; for pure ASCII sources bytes and characters line up
+        if len(source) == len(code):
+            to_char = lambda byte_offset: byte_offset
+        else:
+            to_char = lambda byte_offset: len(source[:byte_offset].decode('utf-8', errors='ignore'))
+
+        symbols = []
+        stack = [tree.root_node]
+        while stack:
+            node = stack.pop()
+            kind = self.node_kinds.get(node.type)
+            name_node = node.child_by_field_name('name') if kind else None
+
+            # const handler = () => {...} and friends
+            if node.type == 'variable_declarator':
+                value = node.child_by_field_name('value')
+                if value is not None and value.type in ('arrow_function', 'function', 'function_expression'):
+                    kind = 'function'
+                    name_node = node.child_by_field_name('name')
+
+            if kind and name_node is not None:
+                start, end = to_char(node.start_byte), to_char(node.end_byte)
+                name = source[name_node.start_byte:name_node.end_byte].decode('utf-8')
+                symbols.append(Symbol(kind, name, start, end))
+            stack.extend(reversed(node.children))
+
+        return symbols
+
+
+# Optional access/storage modifiers in front of a C#/Java declaration
+_MODIFIERS = (
+    r'(?:(?:public|private|protected|internal|static|virtual|override|abstract|sealed|async|'
+    r'final|synchronized|native|extern|unsafe|partial|readonly|new|default|strictfp)\s+)*'
+)
+# Attributes/annotations such as [HttpGet] or @Override are left out of the snippet
+_C_FAMILY_TYPES = rf'^[ \t]*(?P<decl>{_MODIFIERS}(?P<kind>class|interface|struct|enum|record)\s+(?P<name>\w+))'
+_C_FAMILY_METHODS = (
+    rf'^[ \t]*(?P<decl>{_MODIFIERS}(?:[\w.]+(?:<[^<>;{{}}()]*(?:<[^<>;{{}}()]*>)?>)?(?:\[\])*\??\s+)?'
+    r'(?P<name>\w+)\s*(?:<[^<>;{}()]*>)?\s*\([^;{}()]*(?:\([^;{}()]*\)[^;{}()]*)*\)\s*'
+    r'(?:throws\s+[\w.,\s]+|:\s*(?:base|this)\s*\([^;{}]*\)|where\s+[^{;]+)?\s*\{)'
+)
+
+_JS_PATTERNS = [
+    ('class', r'^[ \t]*(?P<decl>(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+(?P<name>\w+))'),
+    ('interface', r'^[ \t]*(?P<decl>(?:export\s+)?interface\s+(?P<name>\w+))'),
+    ('enum', r'^[ \t]*(?P<decl>(?:export\s+)?(?:const\s+)?enum\s+(?P<name>\w+))'),
+    ('function', r'^[ \t]*(?P<decl>(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*(?P<name>\w+))'),
+    ('function', r'^[ \t]*(?P<decl>(?:export\s+)?(?:const|let|var)\s+(?P<name>\w+)\s*(?::[^=]+)?=\s*'
+                 r'(?:async\s+)?(?:function\b|\([^()]*\)\s*(?::\s*[^=]+)?=>|\w+\s*=>))'),
+    ('method', r'^[ \t]*(?P<decl>(?:(?:public|private|protected|static|async|get|set|readonly|override)\s+)*'
+               r'\*?(?P<name>\w+)\s*(?:<[^<>]*>)?\s*\([^()]*\)\s*(?::\s*[^{;]+)?\{)'),
+]
+
+_C_FAMILY_PATTERNS = [
+    ('class', _C_FAMILY_TYPES),  # the matched keyword overrides the kind
+    ('method', _C_FAMILY_METHODS),
+]
+
+
+_JS_NODE_KINDS = {
+    'function_declaration': 'function',
+    'generator_function_declaration': 'function',
+    'class_declaration': 'class',
+    'method_definition': 'method',
+}
+_TS_NODE_KINDS = dict(_JS_NODE_KINDS, **{
+    'abstract_class_declaration': 'class',
+    'interface_declaration': 'interface',
+    'enum_declaration': 'enum',
+})
+_CSHARP_NODE_KINDS = {
+    'class_declaration': 'class',
+    'interface_declaration': 'interface',
+    'struct_declaration': 'struct',
+    'enum_declaration': 'enum',
+    'record_declaration': 'record',
+    'method_declaration': 'method',
+    'constructor_declaration': 'method',
+}
+_JAVA_NODE_KINDS = {
+    'class_declaration': 'class',
+    'interface_declaration': 'interface',
+    'enum_declaration': 'enum',
+    'record_declaration': 'record',
+    'method_declaration': 'method',
+    'constructor_declaration': 'method',
+}
+
+
+def _brace_language_extractor(language, extensions, grammar, node_kinds, patterns):
+    fallback = LexerExtractor(language, extensions, patterns)
+    return TreeSitterExtractor(language, extensions, grammar, node_kinds, fallback)
+
+
+register_extractor(PythonExtractor())
+register_extractor(_brace_language_extractor('javascript', ('.js', '.jsx', '.mjs', '.cjs'), 'javascript', _JS_NODE_KINDS, _JS_PATTERNS))
+register_extractor(_brace_language_extractor('typescript', ('.ts',), 'typescript', _TS_NODE_KINDS, _JS_PATTERNS))
+register_extractor(_brace_language_extractor('tsx', ('.tsx',), 'tsx', _TS_NODE_KINDS, _JS_PATTERNS))
+register_extractor(_brace_language_extractor('csharp', ('.cs',), 'c_sharp', _CSHARP_NODE_KINDS, _C_FAMILY_PATTERNS))
+register_extractor(_brace_language_extractor('java', ('.java',), 'java', _JAVA_NODE_KINDS, _C_FAMILY_PATTERNS))
+
+
+def extract_symbols(code, file_path):
+    """
+    Return the symbols found in a file, or an empty list if the file cannot be parsed.
+    """
+    extractor = get_extractor(file_path)
+    if extractor is None:
+        return []
+    try:
+        return extractor.extract(code)
+    except Exception as e:
+        # One broken file must not abort the whole crawl
+        print(f"Skipping {file_path}: {extractor.language} extractor failed ({type(e).__name__}: {e})")
+        return []
+
+
+def extract_snippets(code, file_path):
+    """
+    Extract symbol-level snippets from a source file in any supported language,
+    formatted with description, tags, and file path.
+    """
+    snippets = []
+    for symbol in extract_symbols(code, file_path):
+        snippets.append({
+            'snippet': code[symbol.start:symbol.end][:MAX_SNIPPET_CHARS],
+            'description': describe_symbol(symbol.kind, symbol.name),
+            'tags': generate_tags(symbol.name),
+            'file_path': file_path
+        })
+    return snippets
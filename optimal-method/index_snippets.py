@@ -1,22 +1,31 @@
-import json
 from elasticsearch import Elasticsearch
 import uuid
+from snippet_store import SnippetStore, iter_snippets, is_snippet_store
 
-def index_snippets(json_file):
+def index_snippets(json_file, progress=None):
     # Connect to Elasticsearch
     es = Elasticsearch(['http://localhost:9200'])  # Adjust URL if necessary
     index_name = 'code_snippets'
 
-    # Load snippets from the JSON file
-    with open(json_file, 'r') as file:
-        snippets = json.load(file)
+    # The store knows its size up front, which lets progress report a fraction
+    total = None
+    if is_snippet_store(json_file):
+        with SnippetStore(json_file) as store:
+            total = len(store)
 
-    # Index each snippet in Elasticsearch
-    for snippet in snippets:
+    # Stream each snippet from the snippet store (or a legacy JSON file) into Elasticsearch
+    count = 0
+    for snippet in iter_snippets(json_file):
         # Use a unique ID for each snippet
         unique_id = str(uuid.uuid4())
         response = es.index(index=index_name, id=unique_id, body=snippet)
         print(f"Indexed snippet with ID {unique_id}: {response['result']}")
 
+        count += 1
+        if progress and count % 100 == 0:
+            progress(count / total if total else 0, f"Indexed {count} snippets")
+    return count
+
 if __name__ == "__main__":
-    index_snippets('code_snippets.json')
+    # Prefer the compact snippet store when it has been generated
+    index_snippets('code_snippets.store' if is_snippet_store('code_snippets.store') else 'code_snippets.json')
@@ -0,0 +1,341 @@
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+from contextlib import closing
+
+# Job handlers, keyed by job type. A handler is called as handler(params, progress)
+# where progress(fraction, message=None) reports how far along the job is, and its
+# return value (anything JSON serializable) is stored as the job result.
+JOB_HANDLERS = {}
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Whether this process has claimed a job yet; until then, running jobs under our PID
+# belong to an earlier process that had the same PID
+_claimed_here = False
+
+
+def register_job(job_type):
+    """
+    Decorator registering a function as the handler for a job type.
+    """
+    def decorator(handler):
+        JOB_HANDLERS[job_type] = handler
+        return handler
+    return decorator
+
+
+def _worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _is_dead_local_worker(worker):
+    host, _, pid = (worker or '').rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit():
+        return False  # another machine, or unknown; cannot tell
+    if int(pid) == os.getpid():
+        return not _claimed_here  # a previous process with our PID, unless we started jobs already
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass  # alive, owned by another user
+    return False
+
+
+class JobQueue:
+    """
+    Persistent job queue stored in SQLite, shared by the web app and any worker processes.
+    """
+
+    def __init__(self, db_path='jobs.db'):
+        self.db_path = db_path
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')  # readers do not block the workers
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    type TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    message TEXT,
+                    result TEXT,
+                    error TEXT,
+                    worker TEXT,
+                    run_after REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, run_after)')
+
+    def _connect(self):
+        # A connection per call keeps the queue safe to use from any thread
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def submit(self, job_type, params=None, run_after=None):
+        """
+        Queue a job and return its ID. run_after (a Unix timestamp) delays the job,
+        e.g. to schedule re-indexing off-peak.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                'INSERT INTO jobs (type, params, status, run_after, created_at) VALUES (?, ?, ?, ?, ?)',
+                (job_type, json.dumps(params or {}), QUEUED, run_after or now, now)
+            )
+            return cursor.lastrowid
+
+    def claim(self, job_types):
+        """
+        Atomically take the oldest runnable job of one of the given types, or return None.
+        """
+        global _claimed_here
+        job_types = list(job_types)
+        if not job_types:
+            return None
+        placeholders = ', '.join('?' * len(job_types))
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')  # serializes claims across threads and processes
+            row = conn.execute(
+                f'SELECT * FROM jobs WHERE status = ? AND run_after <= ? AND type IN ({placeholders}) ORDER BY id LIMIT 1',
+                (QUEUED, time.time(), *job_types)
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            _claimed_here = True
+            conn.execute(
+                'UPDATE jobs SET status = ?, worker = ?, started_at = ? WHERE id = ?',
+                (RUNNING, _worker_id(), time.time(), row['id'])
+            )
+            conn.execute('COMMIT')
+            return self._to_dict(row, status=RUNNING, worker=_worker_id())
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def update_progress(self, job_id, progress, message=None):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                'UPDATE jobs SET progress = ?, message = COALESCE(?, message) WHERE id = ?',
+                (min(max(progress, 0.0), 1.0), message, job_id)
+            )
+
+    def finish(self, job_id, result=None):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, progress = 1, result = ?, finished_at = ? WHERE id = ?',
+                (DONE, json.dumps(result), time.time(), job_id)
+            )
+
+    def fail(self, job_id, error):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+                (FAILED, error, time.time(), job_id)
+            )
+
+    def requeue_interrupted(self):
+        """
+        Put jobs back in the queue whose worker process on this host has died.
+        Jobs run by live processes (e.g. a separate `jobs.py worker`) are left alone.
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute('SELECT id, worker FROM jobs WHERE status = ?', (RUNNING,)).fetchall()
+            dead = [row['id'] for row in rows if _is_dead_local_worker(row['worker'])]
+            for job_id in dead:
+                conn.execute(
+                    'UPDATE jobs SET status = ?, progress = 0, worker = NULL, started_at = NULL WHERE id = ? AND status = ?',
+                    (QUEUED, job_id, RUNNING)
+                )
+            return len(dead)
+
+    def get(self, job_id):
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, status=None, limit=50):
+        with closing(self._connect()) as conn:
+            if status:
+                rows = conn.execute('SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?', (status, limit))
+            else:
+                rows = conn.execute('SELECT * FROM jobs ORDER BY id DESC LIMIT ?', (limit,))
+            return [self._to_dict(row) for row in rows.fetchall()]
+
+    @staticmethod
+    def _to_dict(row, **overrides):
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        job.update(overrides)
+        return job
+
+
+class WorkerPool:
+    """
+    Threads that take jobs from the queue and run the matching handlers.
+
+    job_types limits the pool to some of the handled types, so e.g. searches can
+    get workers of their own that long indexing jobs never occupy.
+    """
+
+    def __init__(self, queue, workers=2, handlers=None, poll_interval=1.0, job_types=None, name='job-worker'):
+        self.queue = queue
+        self.workers = workers
+        self.handlers = JOB_HANDLERS if handlers is None else handlers
+        self.poll_interval = poll_interval
+        self.job_types = job_types
+        self.name = name
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return  # already running
+        self._stop.clear()
+        self.queue.requeue_interrupted()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'{self.name}-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run_one(self):
+        """
+        Run a single queued job if there is one; return whether a job was run.
+        """
+        job_types = self.handlers.keys() if self.job_types is None else set(self.job_types) & self.handlers.keys()
+        job = self.queue.claim(job_types)
+        if job is None:
+            return False
+
+        def progress(fraction, message=None):
+            self.queue.update_progress(job['id'], fraction, message)
+
+        try:
+            result = self.handlers[job['type']](job['params'], progress)
+            for follow_up in job['params'].get('next_jobs', []):
+                # Pipelines such as crawl -> extract -> embed -> index chain through next_jobs
+                self.queue.submit(follow_up['type'], follow_up.get('params'))
+            self.queue.finish(job['id'], result)
+        except Exception as e:
+            print(f"Job {job['id']} ({job['type']}) failed: {e}")
+            self.queue.fail(job['id'], ''.join(traceback.format_exception_only(type(e), e)).strip())
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self.run_one():
+                self._stop.wait(self.poll_interval)
+
+
+def pipeline(*steps):
+    """
+    Chain (type, params) steps and return the type and params of the first job to submit.
+    """
+    next_jobs = []
+    for job_type, params in reversed(steps):
+        params = dict(params or {})
+        if next_jobs:
+            params['next_jobs'] = next_jobs
+        next_jobs = [{'type': job_type, 'params': params}]
+    return next_jobs[0]['type'], next_jobs[0]['params']
+
+
+@register_job('crawl')
+def crawl_job(params, progress):
+    """
+    Update local clones from their origin so the next extract reads fresh code without
+    HTTP crawling. Bare clones get every branch fetched; working trees are fast-forwarded.
+    """
+    import subprocess
+
+    def git(path, *args):
+        result = subprocess.run(['git', '-C', path, *args], capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"git {' '.join(args)} failed in {path}: {result.stderr.strip()}")
+        return result.stdout.strip()
+
+    repos = params.get('local_repos', [])
+    for i, path in enumerate(repos):
+        progress(i / len(repos), f"Fetching {path}")
+        if git(path, 'rev-parse', '--is-bare-repository') == 'true':
+            # `git clone --bare` sets up no fetch refspec, so a plain fetch updates no branches
+            git(path, 'fetch', '--prune', '--quiet', 'origin', '+refs/heads/*:refs/heads/*')
+        else:
+            # Fails with git's own message when the branch has diverged or has no upstream
+            git(path, 'pull', '--ff-only', '--prune', '--quiet')
+    return {'fetched': repos}
+
+
+@register_job('extract')
+def extract_job(params, progress):
+    """
+    Extract snippets from the configured sources into the snippet store.
+    """
+    from connectors import make_connector
+    from create_snippets import search_and_extract_snippets
+
+    connector = None
+    if params.get('local_repos'):
+        connector = make_connector(params['local_repos'], params.get('revision', 'HEAD'))
+    kwargs = {key: params[key] for key in ('output_file', 'store_path', 'revisions_file') if key in params}
+    count = search_and_extract_snippets(connector, progress=progress, **kwargs)
+    if count is None:
+        raise RuntimeError("Snippet extraction failed, see the worker output for details")
+    return {'snippets': count}
+
+
+@register_job('index')
+def index_job(params, progress):
+    """
+    Push the snippet store (or JSON file) into Elasticsearch.
+    """
+    from index_snippets import index_snippets
+
+    count = index_snippets(params.get('snippets_path', 'code_snippets.store'), progress=progress)
+    return {'indexed': count}
+
+
+if __name__ == "__main__":
+    # Usage: python jobs.py worker [workers]
+    #        python jobs.py submit <type> ['<params as JSON>'] [run_after_unix_time]
+    if len(sys.argv) >= 2 and sys.argv[1] == 'worker':
+        pool = WorkerPool(JobQueue(), workers=int(sys.argv[2]) if len(sys.argv) > 2 else 2)
+        pool.start()
+        print(f"Running {pool.workers} workers for job types: {', '.join(sorted(pool.handlers))}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pool.stop()
+    elif len(sys.argv) >= 3 and sys.argv[1] == 'submit':
+        params = json.loads(sys.argv[3]) if len(sys.argv) > 3 else {}
+        run_after = float(sys.argv[4]) if len(sys.argv) > 4 else None
+        print(f"Submitted job {JobQueue().submit(sys.argv[2], params, run_after)}")
+    else:
+        print("Usage: python jobs.py worker [workers] | python jobs.py submit <type> ['<params>'] [run_after]")
+        sys.exit(1)
@@ -0,0 +1,387 @@
+import itertools
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# A snippet store is a directory holding two files (plus publish.lock, see close()):
+#   meta.bin             - columnar metadata (offsets, string ids, tag ids) plus a
+#                          de-duplicated string pool for file paths, descriptions and tags
+#   snippets.<gen>.blob  - every snippet body, zlib-compressed, back to back
+# Every rewrite gets a new blob generation named in meta.bin, so replacing meta.bin
+# is the single atomic rename that switches readers to the new version.
+# While a writer is filling its blob, meta.bin.<gen>.tmp marks the generation as
+# in progress so that other writers publishing meanwhile leave it alone.
+META_FILE = 'meta.bin'
+BLOB_PREFIX = 'snippets.'
+BLOB_SUFFIX = '.blob'
+LOCK_FILE = 'publish.lock'
+
+# A generation still marked in progress whose blob has not been written to for this
+# many seconds was left behind by a writer that crashed, and is removed
+ABANDONED_AFTER = 24 * 60 * 60
+
+# Tells apart writers that start within the same clock tick in one process
+_generations = itertools.count()
+
+MAGIC = b'SNPS'
+VERSION = 2
+
+# Order of the array columns in meta.bin (after the header)
+COLUMNS = [
+    ('blob_offsets', 'Q'),   # count + 1 entries, body i is blob[offsets[i]:offsets[i + 1]]
+    ('file_paths', 'I'),     # string id of each snippet's file path
+    ('descriptions', 'I'),   # string id of each snippet's description
+    ('tag_starts', 'I'),     # count + 1 entries, tags of i are tag_ids[starts[i]:starts[i + 1]]
+    ('tag_ids', 'I'),        # flattened string ids of all tags
+    ('string_offsets', 'Q'), # len(strings) + 1 entries into the string pool
+]
+
+# Header: magic, version, snippet count, byte length of the blob file name, then
+# the byte length of every column and finally the byte length of the string pool.
+# The blob file name follows the header, the columns follow the name.
+HEADER = struct.Struct('<4sIII' + 'Q' * (len(COLUMNS) + 1))
+
+
+def _to_le_bytes(values):
+    """
+    Serialize an array in little-endian order regardless of the host.
+    """
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_le_bytes(typecode, data):
+    """
+    Build an array from little-endian bytes regardless of the host.
+    """
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+@contextmanager
+def _publish_lock(path):
+    """
+    Hold an exclusive lock on the store directory, across threads and processes.
+    """
+    with open(os.path.join(path, LOCK_FILE), 'a+b') as file:
+        if fcntl:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        else:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def is_snippet_store(path):
+    """
+    Check whether the given path points to a snippet store directory.
+    """
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+class SnippetStoreWriter:
+    """
+    Write snippets one at a time into a new snippet store.
+    """
+
+    def __init__(self, path, compression_level=6):
+        self.path = path
+        self.compression_level = compression_level
+        os.makedirs(path, exist_ok=True)
+
+        # The new generation is invisible to readers until close() swaps in meta.bin
+        generation = f'{time.time_ns():x}-{os.getpid()}-{next(_generations)}'
+        self._blob_name = f'{BLOB_PREFIX}{generation}{BLOB_SUFFIX}'
+        self._meta_tmp = os.path.join(path, f'{META_FILE}.{generation}.tmp')
+        # Mark the generation in progress before its blob exists (see close())
+        open(self._meta_tmp, 'xb').close()
+        self._blob = open(os.path.join(path, self._blob_name), 'xb')
+        self._columns = {name: array(typecode) for name, typecode in COLUMNS}
+        self._columns['blob_offsets'].append(0)
+        self._columns['tag_starts'].append(0)
+        self._string_ids = {}  # string -> id, so repeated paths/tags are stored once
+        self._count = 0
+
+    def _intern(self, value):
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self._string_ids)
+            self._string_ids[value] = string_id
+        return string_id
+
+    def add(self, snippet):
+        """
+        Append a snippet dict (snippet, description, tags, file_path) and return its ID.
+        """
+        body = zlib.compress(snippet['snippet'].encode('utf-8'), self.compression_level)
+        self._blob.write(body)
+
+        columns = self._columns
+        columns['blob_offsets'].append(columns['blob_offsets'][-1] + len(body))
+        columns['file_paths'].append(self._intern(snippet.get('file_path', '')))
+        columns['descriptions'].append(self._intern(snippet.get('description', '')))
+        for tag in snippet.get('tags', []):
+            columns['tag_ids'].append(self._intern(tag))
+        columns['tag_starts'].append(len(columns['tag_ids']))
+
+        snippet_id = self._count
+        self._count += 1
+        return snippet_id
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        """
+        Flush the blob file and write the metadata file.
+        """
+        if self._blob.closed:
+            return
+        self._blob.close()
+
+        # Build the string pool in id order
+        pool = bytearray()
+        string_offsets = self._columns['string_offsets']
+        string_offsets.append(0)
+        for value in self._string_ids:  # dicts keep insertion order, which is id order
+            pool += value.encode('utf-8')
+            string_offsets.append(len(pool))
+
+        column_bytes = [_to_le_bytes(self._columns[name]) for name, _ in COLUMNS]
+        blob_name = self._blob_name.encode('utf-8')
+        header = HEADER.pack(MAGIC, VERSION, self._count, len(blob_name), *[len(data) for data in column_bytes], len(pool))
+
+        with open(self._meta_tmp, 'wb') as file:
+            file.write(header)
+            file.write(blob_name)
+            for data in column_bytes:
+                file.write(data)
+            file.write(pool)
+
+        # Publishing and cleanup run under the lock so that no other writer publishes
+        # between our swap and the removal of the generations it made obsolete
+        with _publish_lock(self.path):
+            os.replace(self._meta_tmp, os.path.join(self.path, META_FILE))
+            self._remove_old_generations()
+
+    def _remove_old_generations(self):
+        # Generations other than ours are no longer referenced, unless another writer is
+        # still filling them; readers that still have one open keep it alive until they close it
+        for name in os.listdir(self.path):
+            if not (name.startswith(BLOB_PREFIX) and name.endswith(BLOB_SUFFIX)) or name == self._blob_name:
+                continue
+            generation = name[len(BLOB_PREFIX):-len(BLOB_SUFFIX)]
+            blob_path = os.path.join(self.path, name)
+            marker = os.path.join(self.path, f'{META_FILE}.{generation}.tmp')
+            try:
+                if os.path.exists(marker) and time.time() - os.path.getmtime(blob_path) < ABANDONED_AFTER:
+                    continue
+                os.remove(blob_path)
+                if os.path.exists(marker):
+                    os.remove(marker)
+            except OSError:
+                pass  # still open on platforms that lock open files; removed next time
+
+    def abort(self):
+        """
+        Discard everything written so far and leave the existing store untouched.
+        """
+        if not self._blob.closed:
+            self._blob.close()
+        # The blob goes first: a blob without its in-progress marker counts as obsolete
+        for leftover in (os.path.join(self.path, self._blob_name), self._meta_tmp):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Only a clean exit publishes the new version
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class SnippetStore:
+    """
+    Read-only, memory-mapped view over a snippet store.
+
+    Metadata columns are loaded as compact arrays; snippet bodies and strings
+    stay in the mapped files and are only decoded when a snippet is requested.
+    """
+
+    def __init__(self, path, retries=3):
+        self.path = path
+        for attempt in range(retries):
+            try:
+                self._open()
+                return
+            except FileNotFoundError:
+                # A writer published a new version and removed our blob generation
+                # between reading meta.bin and opening the blob; read meta.bin again
+                self.close()
+                if attempt == retries - 1:
+                    raise
+
+    def _open(self):
+        self._meta_file = open(os.path.join(self.path, META_FILE), 'rb')
+        self._meta = mmap.mmap(self._meta_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, name_size, *sizes = HEADER.unpack_from(self._meta, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"'{self.path}' is not a version {VERSION} snippet store")
+        self._count = count
+
+        offset = HEADER.size
+        blob_name = self._meta[offset:offset + name_size].decode('utf-8')
+        offset += name_size
+        for (name, typecode), size in zip(COLUMNS, sizes):
+            setattr(self, '_' + name, _from_le_bytes(typecode, self._meta[offset:offset + size]))
+            offset += size
+        self._pool_offset = offset
+        self._string_cache = {}
+
+        self._blob_file = open(os.path.join(self.path, blob_name), 'rb')
+        # mmap refuses empty files, which happens for a store with no snippets
+        size = os.fstat(self._blob_file.fileno()).st_size
+        self._blob = mmap.mmap(self._blob_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def _string(self, string_id):
+        value = self._string_cache.get(string_id)
+        if value is None:
+            start = self._pool_offset + self._string_offsets[string_id]
+            end = self._pool_offset + self._string_offsets[string_id + 1]
+            value = self._meta[start:end].decode('utf-8')
+            self._string_cache[string_id] = value
+        return value
+
+    def __len__(self):
+        return self._count
+
+    def get_snippet(self, snippet_id):
+        """
+        Return only the snippet body for the given ID.
+        """
+        if not 0 <= snippet_id < self._count:
+            raise IndexError(f"Snippet ID {snippet_id} out of range")
+        start = self._blob_offsets[snippet_id]
+        end = self._blob_offsets[snippet_id + 1]
+        return zlib.decompress(self._blob[start:end]).decode('utf-8')
+
+    def get_metadata(self, snippet_id):
+        """
+        Return description, tags and file path for the given ID without touching the blob.
+        """
+        if not 0 <= snippet_id < self._count:
+            raise IndexError(f"Snippet ID {snippet_id} out of range")
+        tag_ids = self._tag_ids[self._tag_starts[snippet_id]:self._tag_starts[snippet_id + 1]]
+        return {
+            'description': self._string(self._descriptions[snippet_id]),
+            'tags': [self._string(tag_id) for tag_id in tag_ids],
+            'file_path': self._string(self._file_paths[snippet_id])
+        }
+
+    def __getitem__(self, snippet_id):
+        snippet = {'snippet': self.get_snippet(snippet_id)}
+        snippet.update(self.get_metadata(snippet_id))
+        return snippet
+
+    def __iter__(self):
+        for snippet_id in range(self._count):
+            yield self[snippet_id]
+
+    def close(self):
+        for handle in ('_blob', '_blob_file', '_meta', '_meta_file'):
+            value = getattr(self, handle, None)
+            if hasattr(value, 'close'):
+                value.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def write_store(snippets, path):
+    """
+    Write an iterable of snippet dicts to a snippet store and return how many were written.
+    """
+    with SnippetStoreWriter(path) as writer:
+        for snippet in snippets:
+            writer.add(snippet)
+        return len(writer)
+
+
+def iter_snippets(path):
+    """
+    Stream snippets from either a snippet store or a legacy JSON file.
+    """
+    if is_snippet_store(path):
+        with SnippetStore(path) as store:
+            yield from store
+    else:
+        with open(path, 'r') as file:
+            yield from json.load(file)
+
+
+def json_to_store(json_file, store_path):
+    """
+    Convert a code_snippets.json file into a snippet store.
+    """
+    with open(json_file, 'r') as file:
+        snippets = json.load(file)
+    return write_store(snippets, store_path)
+
+
+def store_to_json(store_path, json_file):
+    """
+    Convert a snippet store back into the original JSON format.
+    """
+    with SnippetStore(store_path) as store:
+        snippets = list(store)
+    with open(json_file, 'w') as file:
+        json.dump(snippets, file, indent=4)
+    return len(snippets)
+
+
+if __name__ == "__main__":
+    # Usage: python snippet_store.py to-store code_snippets.json code_snippets.store
+    #        python snippet_store.py to-json code_snippets.store code_snippets.json
+    if len(sys.argv) != 4 or sys.argv[1] not in ('to-store', 'to-json'):
+        print("Usage: python snippet_store.py (to-store|to-json) <source> <destination>")
+        sys.exit(1)
+
+    command, source, destination = sys.argv[1:]
+    if command == 'to-store':
+        count = json_to_store(source, destination)
+    else:
+        count = store_to_json(source, destination)
+    print(f"Converted {count} snippets from {source} to {destination}.")
@@ -0,0 +1,243 @@
+import heapq
+import json
+import os
+import re
+import threading
+from collections import Counter
+
+from snippet_store import META_FILE, SnippetStore, is_snippet_store
+
+# How many completions each trie node keeps pre-ranked; larger requests fall
+# back to walking the subtree
+TOP_K = 32
+
+# Descriptions are generated as "A function that defines <name>"
+_DEFINES = re.compile(r'defines\s+(\S+)\s*$')
+
+
+class _Node:
+    __slots__ = ('label', 'children', 'weight', 'term', 'top')
+
+    def __init__(self, label=''):
+        self.label = label     # edge label from the parent (radix trie, so it may be several chars)
+        self.children = {}     # first char of the child's label -> child
+        self.weight = 0        # frequency of the term ending here, 0 if none
+        self.term = None       # full lower-case term ending here
+        self.top = None        # cached [(-weight, term)] of the best TOP_K terms below, None if stale
+
+
+class PrefixIndex:
+    """
+    Compressed (radix) trie of terms with frequencies, answering ranked prefix queries.
+
+    Every node caches its best TOP_K completions so a lookup only walks the
+    prefix; updates invalidate the caches along the changed path.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self._display = {}  # lower-case term -> original spelling shown to users
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, term, weight=1):
+        """
+        Add weight to a term (a negative weight removes it again).
+        """
+        key = term.lower()
+        if not key:
+            return
+        node = self._root
+        path = [node]
+        rest = key
+        while rest:
+            child = node.children.get(rest[0])
+            if child is None:
+                if weight <= 0:
+                    return
+                child = _Node(rest)
+                node.children[rest[0]] = child
+                node, rest = child, ''
+            else:
+                common = os.path.commonprefix([child.label, rest])
+                if common != child.label:
+                    if weight <= 0:
+                        return
+                    # Split the edge so the shared part becomes its own node
+                    middle = _Node(common)
+                    child.label = child.label[len(common):]
+                    middle.children[child.label[0]] = child
+                    node.children[common[0]] = middle
+                    child = middle
+                node, rest = child, rest[len(common):]
+            path.append(node)
+
+        was_present = node.weight > 0
+        node.weight = max(node.weight + weight, 0)
+        node.term = key
+        if node.weight > 0:
+            self._display.setdefault(key, term)
+            self._size += not was_present
+        elif was_present:
+            self._display.pop(key, None)
+            self._size -= 1
+
+        for visited in path:
+            visited.top = None
+
+    def remove(self, term, weight=1):
+        self.add(term, -weight)
+
+    def _top(self, node):
+        if node.top is None:
+            candidates = [(-node.weight, node.term)] if node.weight > 0 else []
+            for child in node.children.values():
+                candidates.extend(self._top(child))
+            node.top = heapq.nsmallest(TOP_K, candidates)
+        return node.top
+
+    def _all(self, node):
+        if node.weight > 0:
+            yield (-node.weight, node.term)
+        for child in node.children.values():
+            yield from self._all(child)
+
+    def suggest(self, prefix, limit=10):
+        """
+        Return up to limit (term, weight) pairs starting with prefix, most frequent first.
+        """
+        rest = prefix.lower()
+        node = self._root
+        while rest:
+            child = node.children.get(rest[0])
+            if child is None:
+                return []
+            if rest.startswith(child.label):
+                rest = rest[len(child.label):]
+            elif child.label.startswith(rest):
+                rest = ''
+            else:
+                return []
+            node = child
+
+        ranked = self._top(node) if limit <= TOP_K else heapq.nsmallest(limit, self._all(node))
+        return [(self._display[term], -weight) for weight, term in ranked[:limit]]
+
+
+def snippet_terms(metadata):
+    """
+    Return the symbol name and tags of one snippet as suggestion terms.
+    """
+    # Tags are usually the lower-cased name; keep one term per name, spelled as in the code
+    terms = {tag.lower(): tag for tag in metadata.get('tags', [])}
+    match = _DEFINES.search(metadata.get('description', ''))
+    if match:
+        terms[match.group(1).lower()] = match.group(1)
+    return set(terms.values())
+
+
+class SuggestIndex:
+    """
+    Prefix index over programming keywords and the symbols in a snippet index,
+    kept in sync with the snippet store or JSON file it was built from.
+    """
+
+    def __init__(self, snippets_path=None, keywords_path=None):
+        self.snippets_path = snippets_path
+        self._index = PrefixIndex()
+        self._snippet_counts = Counter()
+        self._snippets_marker_seen = None
+        self._lock = threading.Lock()          # guards the trie
+        self._refresh_lock = threading.Lock()  # only one rescan of the snippet index at a time
+
+        if keywords_path and os.path.exists(keywords_path):
+            with open(keywords_path, 'r') as file:
+                for keyword in json.load(file):
+                    self._index.add(keyword)
+        self.refresh()
+
+    def _snippets_marker(self):
+        # The store's metadata file is replaced last when it is rewritten
+        path = self.snippets_path
+        if is_snippet_store(path):
+            path = os.path.join(path, META_FILE)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _changed(self):
+        marker = self._snippets_marker()
+        return marker is not None and marker != self._snippets_marker_seen
+
+    def _load_counts(self):
+        counts = Counter()
+        if is_snippet_store(self.snippets_path):
+            # Only the metadata columns are read; snippet bodies stay compressed on disk
+            with SnippetStore(self.snippets_path) as store:
+                for snippet_id in range(len(store)):
+                    counts.update(snippet_terms(store.get_metadata(snippet_id)))
+        else:
+            with open(self.snippets_path, 'r') as file:
+                for snippet in json.load(file):
+                    counts.update(snippet_terms(snippet))
+        return counts
+
+    def refresh(self):
+        """
+        Apply changes in the snippet index to the trie, if it changed since the last refresh.
+        Only the terms whose frequency changed are touched. Blocks while rescanning.
+        """
+        if not self.snippets_path:
+            return False
+        with self._refresh_lock:
+            return self._refresh()
+
+    def refresh_async(self):
+        """
+        Cheap check for the request path: if the snippet index changed, rescan it in a
+        background thread and keep answering from the current trie meanwhile.
+        """
+        if not self.snippets_path or not self._changed():
+            return False
+        if not self._refresh_lock.acquire(blocking=False):
+            return False  # a rescan is already running
+
+        def run():
+            try:
+                self._refresh()
+            finally:
+                self._refresh_lock.release()
+
+        threading.Thread(target=run, name='suggest-refresh', daemon=True).start()
+        return True
+
+    def _refresh(self):
+        marker = self._snippets_marker()
+        if marker is None or marker == self._snippets_marker_seen:
+            return False
+
+        try:
+            counts = self._load_counts()
+        except (OSError, ValueError) as e:
+            # e.g. a JSON file still being written by an older writer; keep serving the
+            # current trie and try again once the file changes
+            print(f"Could not read {self.snippets_path} for suggestions: {e}")
+            self._snippets_marker_seen = marker
+            return False
+
+        with self._lock:
+            for term in counts.keys() | self._snippet_counts.keys():
+                delta = counts[term] - self._snippet_counts[term]
+                if delta:
+                    self._index.add(term, delta)
+            self._snippet_counts = counts
+            self._snippets_marker_seen = marker
+        return True
+
+    def suggest(self, prefix, limit=10):
+        with self._lock:
+            return self._index.suggest(prefix, limit)